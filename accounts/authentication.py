@@ -5,15 +5,14 @@ from django.contrib.auth.backends import ModelBackend
 class EmailBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         UserModel = get_user_model()
-        try:
-            user = UserModel.objects.filter(email__iexact=username).first()
-        except UserModel.DoesNotExist:
-            return None
-        else:
-            if (
-                user
-                and user.check_password(password)
-                and self.user_can_authenticate(user)
-            ):
-                return user
+        # .first() returns None rather than raising DoesNotExist. Only the
+        # columns needed to check the credentials are loaded; anything else
+        # is fetched lazily if the caller touches it.
+        user = (
+            UserModel.objects.filter(email__iexact=username)
+            .only("id", "password", "is_active")
+            .first()
+        )
+        if user and user.check_password(password) and self.user_can_authenticate(user):
+            return user
         return None
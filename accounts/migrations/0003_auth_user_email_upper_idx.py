@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    atomic = False
+
+    dependencies = [
+        ("accounts", "0002_auto_20260220_2115"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        # Functional index so `email__iexact` lookups (login by email, signup
+        # uniqueness check) — which compile to UPPER(email) = UPPER(%s) — use a
+        # B-tree lookup instead of scanning auth_user.
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS auth_user_email_upper_idx ON auth_user (UPPER(email));",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS auth_user_email_upper_idx;",
+        ),
+    ]
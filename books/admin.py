@@ -35,6 +35,13 @@ class BookEmbeddingAdmin(admin.ModelAdmin):
         "updated_at",
     )
     exclude = ("embedding",)  # hide the raw vector — too large to display usefully
+    # user_book's __str__ reads its user and book
+    list_select_related = ("user", "user_book__user", "user_book__book")
+
+    def get_queryset(self, request):
+        # Skip the ~1.5 KB vector per row; the detail page's embedding_preview
+        # loads it on access for the single object it shows.
+        return super().get_queryset(request).defer("embedding")
 
     # ── Custom columns ────────────────────────────────────────────────────────
 
@@ -45,8 +52,9 @@ class BookEmbeddingAdmin(admin.ModelAdmin):
     @admin.display(description="Embedding (first 8 dims)")
     def embedding_preview(self, obj):
         if obj.embedding is not None:
-            preview = [round(v, 4) for v in obj.embedding[:8]]
-            return f"{preview}  … ({len(obj.embedding)} dims)"
+            # halfvec columns load as pgvector.HalfVector, which isn't sliceable
+            preview = [round(v, 4) for v in obj.embedding.to_list()[:8]]
+            return f"{preview}  … ({obj.embedding.dimensions()} dims)"
         return "—"
 
     # ── Fieldsets for the detail view ─────────────────────────────────────────
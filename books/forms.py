@@ -11,13 +11,15 @@ class UserBookForm(forms.ModelForm):
         }
 
     def clean(self):
+        # The same rules are CheckConstraints on UserBook; checking them here
+        # attaches the messages to the offending fields instead of the form.
         cleaned_data = super().clean()
         status = cleaned_data.get("status")
         rating = cleaned_data.get("rating")
         notes = cleaned_data.get("notes")
 
         # Validation for Rating
-        if rating and status != "read":
+        if rating is not None and status != "read":
             self.add_error("rating", "You can only rate books that you have read.")
 
         # Validation for Notes
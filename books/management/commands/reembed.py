@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from books.models import UserBook
+from chat.services import upsert_user_book_embeddings
+
+# gemini-embedding-001 accepts at most 100 texts per embed request
+BATCH_SIZE = 100
+
+
+class Command(BaseCommand):
+    help = "Re-embed UserBooks whose BookEmbedding is missing or stale, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-embed every UserBook, not just missing or outdated ones.",
+        )
+
+    def handle(self, *args, **options):
+        queryset = UserBook.objects.select_related("book").order_by("pk")
+        if not options["all"]:
+            queryset = queryset.filter(
+                Q(embedding__isnull=True)
+                | Q(embedding__updated_at__lt=F("date_updated"))
+            )
+
+        total = 0
+        batch = []
+        for user_book in queryset.iterator(chunk_size=BATCH_SIZE):
+            batch.append(user_book)
+            if len(batch) >= BATCH_SIZE:
+                total += upsert_user_book_embeddings(batch)
+                batch = []
+        total += upsert_user_book_embeddings(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Re-embedded {total} books"))
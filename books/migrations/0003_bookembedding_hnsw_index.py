@@ -0,0 +1,28 @@
+from django.db import migrations
+from pgvector.django import HnswIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0002_bookembedding"),
+    ]
+
+    operations = [
+        # Swap the IVFFlat index for HNSW. Only the index is rebuilt — the
+        # embedding rows themselves are left untouched.
+        migrations.RemoveIndex(
+            model_name="bookembedding",
+            name="bookembedding_embedding_ivfflat",
+        ),
+        migrations.AddIndex(
+            model_name="bookembedding",
+            index=HnswIndex(
+                fields=["embedding"],
+                name="bookembedding_embedding_hnsw",
+                m=16,
+                ef_construction=64,
+                opclasses=["vector_cosine_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from pgvector.django import HalfVectorField, HnswIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("books", "0003_bookembedding_hnsw_index"),
+    ]
+
+    operations = [
+        # The vector_cosine_ops index can't survive the type change, so drop it
+        # first and rebuild it with the halfvec operator class afterwards.
+        migrations.RemoveIndex(
+            model_name="bookembedding",
+            name="bookembedding_embedding_hnsw",
+        ),
+        # ALTER COLUMN ... TYPE halfvec(768) USING embedding::halfvec(768)
+        migrations.AlterField(
+            model_name="bookembedding",
+            name="embedding",
+            field=HalfVectorField(dimensions=768),
+        ),
+        migrations.AddIndex(
+            model_name="bookembedding",
+            index=HnswIndex(
+                fields=["embedding"],
+                name="bookembedding_embedding_hnsw",
+                m=16,
+                ef_construction=64,
+                opclasses=["halfvec_cosine_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-15 04:13
+
+import logging
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+
+logger = logging.getLogger(__name__)
+
+# Original rating/notes of every row this migration changes, so nothing a user
+# wrote is lost; unapplying the migration copies them back.
+BACKUP_TABLE = "books_userbook_0005_cleared"
+
+
+def clear_invalid_ratings_and_notes(apps, schema_editor):
+    """Back up, then clear, ratings and notes that break the new constraints."""
+    UserBook = apps.get_model("books", "UserBook")
+    bad_rating = ~Q(status="read") & Q(rating__isnull=False)
+    bad_notes = ~Q(status__in=["reading", "read"]) & ~Q(notes="")
+    affected = UserBook.objects.filter(bad_rating | bad_notes)
+    if not affected.exists():
+        return
+
+    backup = affected.values("id", "status", "rating", "notes")
+    sql, params = backup.query.sql_with_params()
+    schema_editor.execute(
+        f"CREATE TABLE {schema_editor.quote_name(BACKUP_TABLE)} AS {sql}", params
+    )
+    ratings = UserBook.objects.filter(bad_rating).update(rating=None)
+    notes = UserBook.objects.filter(bad_notes).update(notes="")
+    logger.warning(
+        "Cleared %s ratings on unread books and %s notes on want-to-read books; "
+        "originals saved in %s",
+        ratings,
+        notes,
+        BACKUP_TABLE,
+    )
+
+
+def restore_ratings_and_notes(apps, schema_editor):
+    if BACKUP_TABLE not in schema_editor.connection.introspection.table_names():
+        return
+    UserBook = apps.get_model("books", "UserBook")
+    table = schema_editor.quote_name(BACKUP_TABLE)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT id, rating, notes FROM {table}")
+        rows = cursor.fetchall()
+    for pk, rating, notes in rows:
+        UserBook.objects.filter(pk=pk).update(rating=rating, notes=notes)
+    schema_editor.execute(f"DROP TABLE {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_bookembedding_halfvec'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            clear_invalid_ratings_and_notes, restore_ratings_and_notes
+        ),
+        migrations.AddConstraint(
+            model_name='userbook',
+            constraint=models.CheckConstraint(condition=models.Q(('rating__isnull', True), ('status', 'read'), _connector='OR'), name='ub_rating_only_read', violation_error_message='You can only rate books that you have read.'),
+        ),
+        migrations.AddConstraint(
+            model_name='userbook',
+            constraint=models.CheckConstraint(condition=models.Q(('notes', ''), ('status__in', ['reading', 'read']), _connector='OR'), name='ub_notes_only_active', violation_error_message='You can only add notes to books you are reading or have read.'),
+        ),
+    ]
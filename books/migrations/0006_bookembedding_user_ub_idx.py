@@ -0,0 +1,20 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    atomic = False
+
+    dependencies = [
+        ("books", "0005_userbook_constraints"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="bookembedding",
+            index=models.Index(
+                fields=["user", "user_book"], name="bookembedding_user_ub_idx"
+            ),
+        ),
+    ]
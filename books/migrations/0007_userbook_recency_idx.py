@@ -0,0 +1,21 @@
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+    atomic = False
+
+    dependencies = [
+        ("books", "0006_bookembedding_user_ub_idx"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="userbook",
+            index=models.Index(
+                fields=["user", "status", "-date_updated"],
+                name="ub_user_status_recency_idx",
+            ),
+        ),
+    ]
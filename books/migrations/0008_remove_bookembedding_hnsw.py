@@ -0,0 +1,18 @@
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # DROP INDEX CONCURRENTLY cannot run inside a transaction block.
+    atomic = False
+
+    dependencies = [
+        ("books", "0007_userbook_recency_idx"),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name="bookembedding",
+            name="bookembedding_embedding_hnsw",
+        ),
+    ]
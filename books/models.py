@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
-from pgvector.django import VectorField
+from pgvector.django import HalfVectorField
 import os
 
 
@@ -32,6 +32,26 @@ class UserBook(models.Model):
 
     class Meta:
         unique_together = ("user", "book")
+        indexes = [
+            # Serves "what did I read last?" as an index range scan returning
+            # the first k rows instead of sorting the user's whole shelf.
+            models.Index(
+                fields=["user", "status", "-date_updated"],
+                name="ub_user_status_recency_idx",
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(rating__isnull=True) | models.Q(status="read"),
+                name="ub_rating_only_read",
+                violation_error_message="You can only rate books that you have read.",
+            ),
+            models.CheckConstraint(
+                condition=models.Q(notes="") | models.Q(status__in=["reading", "read"]),
+                name="ub_notes_only_active",
+                violation_error_message="You can only add notes to books you are reading or have read.",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.book.title} ({self.status})"
@@ -41,7 +61,9 @@ class BookEmbedding(models.Model):
     """Stores pgvector embeddings for a user's books.
 
     One row per UserBook — upserted whenever the UserBook changes.
-    The vector dimension (768) matches gemini-embedding-001 output.
+    The vector dimension (768) matches gemini-embedding-001 output; it is
+    stored as halfvec (fp16) to halve row size. Searches are exact per user
+    (see chat.services._candidate_search_sql), so there is no ANN index.
     """
 
     user_book = models.OneToOneField(
@@ -55,11 +77,17 @@ class BookEmbedding(models.Model):
         related_name="book_embeddings",
     )
     content = models.TextField(help_text="The plain-text that was embedded.")
-    embedding = VectorField(dimensions=os.getenv("EMBEDDING_DIMENSIONS", 768))
+    embedding = HalfVectorField(dimensions=os.getenv("EMBEDDING_DIMENSIONS", 768))
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = []  # IVFFlat / HNSW index added in migration for production
+        indexes = [
+            # Per-user scans that join back to UserBook (recency path, small-shelf
+            # probe, status/genre-filtered search) read both columns from one index.
+            models.Index(
+                fields=["user", "user_book"], name="bookembedding_user_ub_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"Embedding: {self.user_book}"
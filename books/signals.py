@@ -1,29 +1,116 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from books.models import UserBook
-from chat.services import AIService
+from chat.services import upsert_user_book_embeddings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# One embed API request's worth of entries per upsert
+EMBED_BATCH_SIZE = 100
+
+# How long the background thread waits for more saves before embedding, so a
+# burst of requests (e.g. marking several books read) shares one API call.
+EMBED_DEBOUNCE_SECONDS = 0.1
+
+_pending = threading.local()
+
+# Ids committed by any request thread and not yet picked up by the executor
+_queued_ids = set()
+_queue_lock = threading.Lock()
+_drain_scheduled = False
+
+# Embedding calls Gemini (hundreds of ms), so it runs on a background thread
+# and the request that saved the UserBook returns without waiting for it.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-user-book")
+
+
+def _pending_ids() -> set:
+    if not hasattr(_pending, "ids"):
+        _pending.ids = set()
+    return _pending.ids
 
-@receiver(post_save, sender=UserBook)
+
+def _embed_user_books(pks):
+    close_old_connections()
+    try:
+        for start in range(0, len(pks), EMBED_BATCH_SIZE):
+            _embed_chunk(pks[start : start + EMBED_BATCH_SIZE])
+        logger.info(f"Finished embedding {len(pks)} user books")
+    finally:
+        close_old_connections()
+
+
+def _embed_chunk(pks):
+    # A debounced batch mixes many users' saves, so one bad row (e.g. a
+    # UserBook deleted before the INSERT) must not lose everyone else's:
+    # if the batched upsert fails, retry the entries one at a time.
+    try:
+        # Re-read committed rows: picks up the final state of entries saved
+        # several times, and silently drops ones whose transaction rolled back.
+        user_books = list(UserBook.objects.select_related("book").filter(pk__in=pks))
+    except Exception as e:
+        logger.error(f"Error loading user books {pks}: {e}", exc_info=True)
+        return
+
+    try:
+        upsert_user_book_embeddings(user_books)
+        return
+    except Exception as e:
+        logger.error(
+            f"Batched embedding of {len(pks)} user books failed, retrying one by one: {e}",
+            exc_info=True,
+        )
+
+    for user_book in user_books:
+        try:
+            upsert_user_book_embeddings([user_book])
+        except Exception as e:
+            logger.error(
+                f"Error embedding user book {user_book.pk}: {e}", exc_info=True
+            )
+
+
+def _drain_queued_embeddings():
+    global _drain_scheduled
+    time.sleep(EMBED_DEBOUNCE_SECONDS)
+    with _queue_lock:
+        pks = list(_queued_ids)
+        _queued_ids.clear()
+        _drain_scheduled = False
+    _embed_user_books(pks)
+
+
+def _flush_pending_embeddings():
+    global _drain_scheduled
+    ids = _pending_ids()
+    if not ids:
+        return  # already flushed by an earlier on_commit callback
+    with _queue_lock:
+        _queued_ids.update(ids)
+        ids.clear()
+        if _drain_scheduled:
+            return  # the queued drain will pick these up
+        _drain_scheduled = True
+    _executor.submit(_drain_queued_embeddings)
+
+
+# dispatch_uid keeps the handler from being connected twice if this module
+# is ever imported under a second path, which would embed every save twice.
+@receiver(post_save, sender=UserBook, dispatch_uid="books.embed_user_book")
 def embed_user_book(sender, instance, created, **kwargs):
     logger.info(f"Signal received for UserBook {instance.id}. Created: {created}")
-    print(f"Signal received for UserBook {instance.id}. Created: {created}")
     # Skip if status is empty on an update to save API costs
     if not created and not instance.status:
         logger.info("Update skipped due to empty status")
-        print("Update skipped due to empty status")
         return
 
-    try:
-        logger.info("Embedding user book...")
-        print("Embedding user book...")
-        service = AIService(instance.user)
-        service.add_user_book_to_vectorstore(instance)
-        logger.info("Successfully requested embedding")
-        print("Successfully requested embedding")
-    except Exception as e:
-        # Avoid breaking the save process if AI service fails
-        logger.error(f"Error embedding user book: {e}")
+    # Saves inside one transaction (e.g. a bulk import) are embedded together
+    # once it commits; outside a transaction on_commit runs immediately.
+    _pending_ids().add(instance.pk)
+    transaction.on_commit(_flush_pending_embeddings)
@@ -6,7 +6,7 @@ from django.views.decorators.http import require_http_methods
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from accounts.forms import EmailSignUpForm
-from django.db.models import Avg, Subquery, OuterRef, CharField, Q
+from django.db.models import Avg, Count, Subquery, OuterRef, CharField, Q
 from django.urls import reverse_lazy
 from .models import Book, UserBook
 from .forms import UserBookForm
@@ -18,13 +18,16 @@ class HomeView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            user_books = UserBook.objects.filter(user=self.request.user)
+            # One aggregate query instead of separate count/count/avg round-trips
+            stats = UserBook.objects.filter(user=self.request.user).aggregate(
+                total=Count("id"),
+                read=Count("id", filter=Q(status="read")),
+                avg_rating=Avg("rating"),
+            )
             context["stats"] = {
-                "total_books": user_books.count(),
-                "books_read": user_books.filter(status="read").count(),
-                "avg_rating": round(
-                    user_books.aggregate(Avg("rating"))["rating__avg"] or 0, 1
-                ),
+                "total_books": stats["total"],
+                "books_read": stats["read"],
+                "avg_rating": round(stats["avg_rating"] or 0, 1),
                 "streak": 0,  # Placeholder for now
             }
         return context
@@ -108,7 +111,10 @@ def add_to_shelf(request, pk):
 
 @login_required
 def edit_user_book(request, pk):
-    user_book = get_object_or_404(UserBook, pk=pk, user=request.user)
+    # The row/modal templates render user_book.book — load it with the entry
+    user_book = get_object_or_404(
+        UserBook.objects.select_related("book"), pk=pk, user=request.user
+    )
 
     if request.method == "POST":
         form = UserBookForm(request.POST, instance=user_book)
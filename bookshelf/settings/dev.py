@@ -27,6 +27,10 @@ DATABASES = {
         "HOST": tmpPostgres.hostname,
         "PORT": tmpPostgres.port,
         "OPTIONS": dict(parse_qsl(tmpPostgres.query)),
+        # Reuse each gunicorn thread's connection for up to a minute instead of
+        # paying the TCP + TLS + auth handshake on every request.
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -63,4 +67,4 @@ SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
 
-# pgvector is used for embeddings — no Railway volume or CHROMA_PERSIST_DIR needed.
+# pgvector is used for embeddings — no Railway volume or persist directory needed.
@@ -1,5 +1,12 @@
 import os
+import re
+import math
+import hashlib
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import mul
 from typing import List, Optional
 
 from dotenv import load_dotenv
@@ -8,7 +15,8 @@ from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmb
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-from pgvector.django import CosineDistance
+from django.core.cache import cache
+from pgvector import HalfVector
 
 load_dotenv()
 
@@ -22,6 +30,24 @@ if not GOOGLE_API_KEY:
 
 EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIMENSIONS", "768"))
 
+# Nearest neighbours fetched per rewritten query (over-retrieve for MMR)
+CANDIDATES_PER_QUERY = 12
+
+# stream_ask coalesces LLM tokens into chunks of at least this many characters,
+# or whatever has arrived once this many seconds passed since the last chunk
+STREAM_BUFFER_CHARS = 256
+STREAM_FLUSH_SECONDS = 0.25
+
+# Maximal Marginal Relevance trade-off: 1.0 ranks purely by similarity to the
+# question, lower values favour entries unlike the ones already picked.
+MMR_LAMBDA = 0.7
+
+# Questions with fewer than this many words are searched as-is, without an LLM rewrite
+REWRITE_MIN_WORDS = 5
+
+# How long repeated questions can reuse their query embeddings
+QUERY_EMBEDDING_CACHE_TTL = 60 * 60 * 24
+
 # Shared models
 _embeddings = GoogleGenerativeAIEmbeddings(
     model="models/gemini-embedding-001",
@@ -36,6 +62,13 @@ _llm = ChatGoogleGenerativeAI(
     google_api_key=GOOGLE_API_KEY,
 )
 
+# Runs the query rewrite while the intent classifier is still waiting on Gemini;
+# one slot per gunicorn request thread (--threads in Procfile/entrypoint.sh).
+REWRITE_WORKERS = int(os.getenv("GUNICORN_THREADS", "10"))
+_rewrite_executor = ThreadPoolExecutor(
+    max_workers=REWRITE_WORKERS, thread_name_prefix="query-rewrite"
+)
+
 # ─── Prompts ────────────────────────────────────────────────────────────────
 
 RETRIEVAL_PROMPT = PromptTemplate.from_template(
@@ -72,22 +105,6 @@ Output only the rewritten queries, one per line.""",
     ]
 )
 
-RERANK_PROMPT = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            """You are a relevance judge.
-Given a user question and a book entry, assign a relevance score 0–10.
-- 10 = perfectly matches what the user is asking for
-- 5  = somewhat related
-- 0  = completely unrelated
-
-Output ONLY the score as integer.""",
-        ),
-        ("human", "Question: {question}\n\nBook entry:\n{content}\n\nScore:"),
-    ]
-)
-
 INTENT_CLASSIFICATION_PROMPT = ChatPromptTemplate.from_messages(
     [
         (
@@ -113,18 +130,247 @@ User: {question}
 Response:"""
 )
 
+# ─── Chains ─────────────────────────────────────────────────────────────────
+# Composed once at import; building `PROMPT | _llm | parser` allocates a new
+# RunnableSequence, so the hot paths reuse these instead.
+
+_ANSWER_CHAIN = RETRIEVAL_PROMPT | _llm | StrOutputParser()
+_SMALL_TALK_CHAIN = SMALL_TALK_PROMPT | _llm | StrOutputParser()
+_INTENT_CHAIN = INTENT_CLASSIFICATION_PROMPT | _llm | StrOutputParser()
+_REWRITE_CHAIN = QUERY_REWRITE_PROMPT | _llm | StrOutputParser()
+
+# ─── Question classifiers ───────────────────────────────────────────────────
+# Each phrase list is compiled into one alternation so a question is scanned
+# once per category by the regex engine instead of once per phrase in Python.
+
+
+def _phrase_re(phrases: List[str]) -> "re.Pattern[str]":
+    return re.compile("|".join(map(re.escape, phrases)))
+
+
+# Checked in order: "reading" contains "read", so the more specific
+# reading/want-to-read phrases must win before the generic "read" ones.
+_STATUS_RES = {
+    "reading": _phrase_re(["currently reading", "still reading", "am reading"]),
+    "want_to_read": _phrase_re(["want to read", "to-read", "plan to read", "future"]),
+    "read": _phrase_re(
+        [
+            "finished",
+            "completed",
+            "already read",
+            "have read",
+            "last read",
+            "most recent",
+            "recently read",
+        ]
+    ),
+}
+
+_RECENCY_RE = _phrase_re(
+    [
+        "last read",
+        "most recent",
+        "recently read",
+        "latest read",
+        "last book",
+        "latest book",
+        "most recently",
+        "just finished",
+        "last finished",
+        "just read",
+    ]
+)
+
+# Matched phrase -> genre_filter value (spaces and hyphens dropped)
+_GENRE_NORM = {
+    "sci-fi": "scifi",
+    "science fiction": "sciencefiction",
+    "fantasy": "fantasy",
+    "mystery": "mystery",
+    "thriller": "thriller",
+    "romance": "romance",
+    "non-fiction": "nonfiction",
+}
+_GENRE_RE = _phrase_re(list(_GENRE_NORM))
+
+
+@lru_cache(maxsize=256)
+def _classify_question(question: str) -> dict:
+    """Recency/status/genre of a question, scanned once and cached."""
+    q = question.lower()
+    status = next((s for s, rx in _STATUS_RES.items() if rx.search(q)), None)
+    genre = _GENRE_RE.search(q)
+    return {
+        "recency": _RECENCY_RE.search(q) is not None,
+        "status": status,
+        "genre": _GENRE_NORM[genre.group(0)] if genre else None,
+    }
+
 # ─── Helpers ────────────────────────────────────────────────────────────────
 
 
-def _embed_text(text: str, is_query: bool = False) -> List[float]:
+def _embed_texts(texts: List[str], is_query: bool = False) -> List[List[float]]:
+    """Embed many texts at once — embed_documents sends up to 100 per API call."""
     task = "retrieval_query" if is_query else "retrieval_document"
     try:
-        return _embeddings.embed_query(
-            text, task_type=task, output_dimensionality=EMBEDDING_DIM
+        return _embeddings.embed_documents(
+            texts, task_type=task, output_dimensionality=EMBEDDING_DIM
         )
     except Exception as e:
-        logger.error(f"Embedding failed: {e}", exc_info=True)
-        return [0.0] * EMBEDDING_DIM  # fallback
+        logger.error(f"Batch embedding failed: {e}", exc_info=True)
+        return [[0.0] * EMBEDDING_DIM for _ in texts]  # fallback
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _embed_queries(queries: List[str]) -> List[List[float]]:
+    """Embed search queries, reusing cached vectors for ones seen before.
+
+    Only the misses are sent to the API, still as a single batched call.
+    """
+    keys = {q: f"qemb:{EMBEDDING_DIM}:{_sha1(q)}" for q in queries}
+    vectors = cache.get_many(keys.values())
+
+    misses = [q for q in queries if keys[q] not in vectors]
+    if misses:
+        new_vectors = _embed_texts(misses, is_query=True)
+        fresh = {keys[q]: vec for q, vec in zip(misses, new_vectors)}
+        vectors.update(fresh)
+        # Don't cache the all-zero fallback returned when the API call fails
+        cache.set_many(
+            {key: vec for key, vec in fresh.items() if any(vec)},
+            QUERY_EMBEDDING_CACHE_TTL,
+        )
+    return [vectors[keys[q]] for q in queries]
+
+
+def _candidate_search_sql(vecs, user_id, status_filter=None, genre_filter=None):
+    """Exact nearest-neighbour search for every query vector in one statement."""
+    from books.models import Book, BookEmbedding, UserBook
+
+    joins = ""
+    where = "e.user_id = %s"
+    filter_params = [user_id]
+    if status_filter or genre_filter:
+        joins += f" JOIN {UserBook._meta.db_table} ub ON ub.id = e.user_book_id"
+    if status_filter:
+        where += " AND ub.status = %s"
+        filter_params.append(status_filter)
+    if genre_filter:
+        # genre_filter is one of our fixed normalized names — no LIKE wildcards
+        joins += f" JOIN {Book._meta.db_table} b ON b.id = ub.book_id"
+        where += " AND b.genre ILIKE %s"
+        filter_params.append(f"%{genre_filter}%")
+
+    subquery = (
+        "(SELECT id, content, embedding <=> %s::halfvec AS distance FROM shelf"
+        f" ORDER BY distance LIMIT {CANDIDATES_PER_QUERY:d})"
+    )
+    sql = (
+        "WITH shelf AS MATERIALIZED ("
+        f"SELECT e.id, e.content, e.embedding FROM {BookEmbedding._meta.db_table} e"
+        f"{joins}"
+        f" WHERE {where})"
+        " SELECT id, content, MIN(distance) AS distance"
+        f" FROM ({' UNION ALL '.join([subquery] * len(vecs))}) AS candidates"
+        " GROUP BY id, content ORDER BY distance"
+    )
+    params = filter_params + [HalfVector(vec).to_text() for vec in vecs]
+    return sql, params
+
+
+def _mmr(candidates, embeddings: dict, k: int, lam: float = MMR_LAMBDA) -> List:
+    """Pick k candidates by Maximal Marginal Relevance (embeddings: {id: vector})."""
+    # map(mul) and hypot keep the per-element loops in C
+    vectors = [embeddings[doc.id].to_list() for doc in candidates]
+    norms = [math.hypot(*vec) or 1.0 for vec in vectors]
+
+    relevance = [1.0 - doc.distance for doc in candidates]
+    redundancy = [0.0] * len(candidates)  # max similarity to any picked entry
+    remaining = set(range(len(candidates)))
+    picked = []
+    while remaining and len(picked) < k:
+        best = max(
+            remaining, key=lambda i: lam * relevance[i] - (1 - lam) * redundancy[i]
+        )
+        remaining.discard(best)
+        picked.append(best)
+        best_vec, best_norm = vectors[best], norms[best]
+        for i in remaining:
+            sim = sum(map(mul, vectors[i], best_vec)) / (norms[i] * best_norm)
+            if sim > redundancy[i]:
+                redundancy[i] = sim
+    return [candidates[i] for i in picked]
+
+
+def _coalesce(
+    chunks, min_chars: int = STREAM_BUFFER_CHARS, max_wait: float = STREAM_FLUSH_SECONDS
+):
+    """Merge small streamed chunks; the first is sent straight away."""
+    buf = []
+    buflen = 0
+    last_flush = None  # None until the first chunk has gone out
+    for chunk in chunks:
+        buf.append(chunk)
+        buflen += len(chunk)
+        now = time.monotonic()
+        if last_flush is None or buflen >= min_chars or now - last_flush >= max_wait:
+            yield "".join(buf)
+            buf.clear()
+            buflen = 0
+            last_flush = now
+    if buf:
+        yield "".join(buf)
+
+
+def _build_doc_text(instance) -> str:
+    """Plain-text representation of a UserBook that gets embedded."""
+    return (
+        f"Book: {instance.book.title} by {instance.book.author}. "
+        f"Genre: {instance.book.genre}. "
+        f"Year: {instance.book.publication_year or 'unknown'}. "
+        f"Status: {instance.status}. "
+        f"Rating: {instance.rating or 'None'}. "
+        f"Notes: {instance.notes or 'No notes'}. "
+        f"Last updated: {instance.date_updated.strftime('%Y-%m-%d %H:%M') if instance.date_updated else 'unknown'}."
+    )
+
+
+def upsert_user_book_embeddings(user_books) -> int:
+    """Embed and upsert UserBooks (with book loaded); returns rows written."""
+    from books.models import BookEmbedding
+
+    user_books = list(user_books)
+    if not user_books:
+        return 0
+
+    texts = [_build_doc_text(ub) for ub in user_books]
+    vectors = _embed_texts(texts)
+
+    # Skip the all-zero fallback of a failed embed so `reembed` still retries it
+    rows = [
+        BookEmbedding(user_book=ub, user_id=ub.user_id, content=text, embedding=vector)
+        for ub, text, vector in zip(user_books, texts, vectors)
+        if any(vector)
+    ]
+    if len(rows) < len(user_books):
+        logger.warning(
+            "Skipped %s UserBooks whose embedding failed",
+            len(user_books) - len(rows),
+        )
+    if not rows:
+        return 0
+
+    BookEmbedding.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["user_book"],
+        update_fields=["content", "embedding", "updated_at"],
+    )
+    logger.info("Upserted embeddings for %s UserBooks", len(rows))
+    return len(rows)
 
 
 class AIService:
@@ -132,12 +378,12 @@ class AIService:
 
     def __init__(self, user):
         self.user = user
+        self._shelf_probe = {}  # k -> result of _small_shelf(k)
 
     def _classify_intent(self, question: str) -> str:
         """Classify if the question is small talk or a bookshelf query."""
         try:
-            chain = INTENT_CLASSIFICATION_PROMPT | _llm | StrOutputParser()
-            intent = chain.invoke({"question": question}).strip().lower()
+            intent = _INTENT_CHAIN.invoke({"question": question}).strip().lower()
             if "small_talk" in intent:
                 return "small_talk"
             return "bookshelf_query"
@@ -159,63 +405,74 @@ class AIService:
             logger.debug(f"  {i}. distance={dist_str} | {doc.content[:180]}...")
 
     def _parse_status_filter(self, question: str) -> Optional[str]:
-        q = question.lower()
-        # Check more specific phrases first to avoid substring collisions
-        # ("reading" contains "read", so check for reading/currently reading first)
-        if any(w in q for w in ["currently reading", "still reading", "am reading"]):
-            return "reading"
-        if any(w in q for w in ["want to read", "to-read", "plan to read", "future"]):
-            return "want_to_read"
-        if any(
-            w in q
-            for w in [
-                "finished",
-                "completed",
-                "already read",
-                "have read",
-                "last read",
-                "most recent",
-                "recently read",
-            ]
-        ):
-            return "read"
-        return None
+        return _classify_question(question)["status"]
 
     def _is_recency_query(self, question: str) -> bool:
         """Detect questions specifically about the most recent book."""
-        q = question.lower()
-        recency_phrases = [
-            "last read",
-            "most recent",
-            "recently read",
-            "latest read",
-            "last book",
-            "latest book",
-            "most recently",
-            "just finished",
-            "last finished",
-            "just read",
-        ]
-        return any(phrase in q for phrase in recency_phrases)
+        return _classify_question(question)["recency"]
 
     def _parse_genre_filter(self, question: str) -> Optional[str]:
-        q = question.lower()
-        common_genres = [
-            "sci-fi",
-            "science fiction",
-            "fantasy",
-            "mystery",
-            "thriller",
-            "romance",
-            "non-fiction",
-        ]
-        for g in common_genres:
-            if g in q:
-                return g.replace(" ", "").replace("-", "")  # normalize
-        return None
+        return _classify_question(question)["genre"]
+
+    def _should_rewrite(self, question: str) -> bool:
+        """Short questions and ones with an explicit status/genre filter are
+        already keyword-like, so an LLM rewrite adds latency but little recall."""
+        if len(question.split()) < REWRITE_MIN_WORDS:
+            return False
+        return not (
+            self._parse_status_filter(question) or self._parse_genre_filter(question)
+        )
+
+    def _rewrite_queries(self, question: str) -> List[str]:
+        """Expand the question into 2–3 keyword-rich search queries."""
+        try:
+            rewritten = _REWRITE_CHAIN.invoke({"question": question})
+            queries = [q.strip() for q in rewritten.split("\n") if q.strip()][:3]
+            if not queries:
+                queries = [question]
+            logger.debug(f"Rewritten queries: {queries}")
+        except Exception as e:
+            logger.warning(f"Query rewrite failed: {e}")
+            queries = [question]
+        return queries
 
-    def get_context(self, question: str, k: int = 6) -> str:
-        """Improved retrieval with query rewriting + filtering + reranking"""
+    def _small_shelf(self, k: int) -> Optional[List[str]]:
+        """The user's whole shelf if it has at most k entries, else None (memoized)."""
+        from books.models import BookEmbedding
+
+        if k not in self._shelf_probe:
+            shelf = list(
+                BookEmbedding.objects.filter(user=self.user).values_list(
+                    "content", flat=True
+                )[: k + 1]
+            )
+            self._shelf_probe[k] = shelf if len(shelf) <= k else None
+        return self._shelf_probe[k]
+
+    def _classify_and_rewrite(self, question: str, k: int = 6):
+        """Classify intent while rewriting the question; returns (intent, queries)."""
+        if self._is_recency_query(question):
+            return self._classify_intent(question), None
+        if not self._should_rewrite(question):
+            return self._classify_intent(question), [question]
+        if self._small_shelf(k) is not None:
+            return self._classify_intent(question), None
+
+        rewrite = _rewrite_executor.submit(self._rewrite_queries, question)
+        intent = self._classify_intent(question)
+        if intent == "small_talk":
+            rewrite.cancel()  # only helps if the rewrite hasn't started yet
+            return intent, None
+        return intent, rewrite.result()
+
+    def get_context(
+        self, question: str, k: int = 6, queries: Optional[List[str]] = None
+    ) -> str:
+        """Improved retrieval with query rewriting + filtering + MMR reranking.
+
+        ``queries`` are pre-computed rewrites (see _classify_and_rewrite);
+        when omitted the question is rewritten here.
+        """
         from books.models import BookEmbedding
 
         # 1. Short-circuit for recency questions — order by date_updated, not cosine distance.
@@ -223,77 +480,73 @@ class AIService:
         #    a metadata property, not a semantic one.
         if self._is_recency_query(question):
             status_filter = self._parse_status_filter(question)
-            recency_qs = BookEmbedding.objects.filter(user=self.user)
+            # Filter on the UserBook side so ub_user_status_recency_idx drives
+            # the scan; only content is read, as plain strings.
+            recency_qs = BookEmbedding.objects.filter(user_book__user=self.user)
             if status_filter:
                 recency_qs = recency_qs.filter(user_book__status=status_filter)
             else:
                 # Default to books that have been read when asking about "last read"
                 recency_qs = recency_qs.filter(user_book__status="read")
 
-            recent_docs = list(recency_qs.order_by("-user_book__date_updated")[:k])
-            self._log_retrieved_docs(
-                recent_docs, "Recency query — ordered by date_updated"
+            contents = list(
+                recency_qs.order_by("-user_book__date_updated").values_list(
+                    "content", flat=True
+                )[:k]
+            )
+            logger.info(
+                f"Recency query — {len(contents)} entries ordered by date_updated"
             )
-            return "\n\n".join(r.content for r in recent_docs) if recent_docs else ""
+            return "\n\n".join(contents)
+
+        # 2. Small shelves: when the user has no more than k entries, every one of
+        #    them goes into the context anyway — skip rewrite, search and rerank.
+        shelf = self._small_shelf(k)
+        if shelf is not None:
+            logger.info(f"Small shelf ({len(shelf)} entries) — skipping vector search")
+            return "\n\n".join(shelf)
 
-        # 2. Try to extract explicit filters from question
+        # 3. Try to extract explicit filters from question
         status_filter = self._parse_status_filter(question)
         genre_filter = self._parse_genre_filter(question)
 
-        # 3. Generate better retrieval queries
-        try:
-            rewrite_chain = QUERY_REWRITE_PROMPT | _llm | StrOutputParser()
-            rewritten = rewrite_chain.invoke({"question": question})
-            queries = [q.strip() for q in rewritten.split("\n") if q.strip()][:3]
-            if not queries:
+        # 4. Generate better retrieval queries (unless the caller already did)
+        if queries is None:
+            if self._should_rewrite(question):
+                queries = self._rewrite_queries(question)
+            else:
                 queries = [question]
-            logger.debug(f"Rewritten queries: {queries}")
-        except Exception as e:
-            logger.warning(f"Query rewrite failed: {e}")
-            queries = [question]
 
-        # 4. Retrieve candidates (over-retrieve)
-        all_docs = []
-        base_qs = BookEmbedding.objects.filter(user=self.user)
-
-        if status_filter:
-            base_qs = base_qs.filter(user_book__status=status_filter)
-        if genre_filter:
-            base_qs = base_qs.filter(user_book__book__genre__icontains=genre_filter)
+        # 5. Retrieve candidates (over-retrieve) for all queries in one statement
+        vecs = _embed_queries(queries)  # at most one embedding API call
+        sql, params = _candidate_search_sql(
+            vecs, self.user.id, status_filter, genre_filter
+        )
 
-        for q in queries:
-            try:
-                vec = _embed_text(q, is_query=True)
-                results = base_qs.annotate(
-                    distance=CosineDistance("embedding", vec)
-                ).order_by("distance")[
-                    :12
-                ]  # over-retrieve
-                all_docs.extend(results)
-            except Exception as e:
-                logger.error(f"Vector search failed for query '{q}': {e}")
+        try:
+            all_docs = list(BookEmbedding.objects.raw(sql, params))
+        except Exception as e:
+            logger.error(f"Vector search failed for queries {queries}: {e}")
+            all_docs = []
 
-        # Deduplicate
-        unique = {r.id: r for r in all_docs}.values()
-        self._log_retrieved_docs(unique, "Candidates before rerank")
+        # Already deduplicated and ordered by distance in SQL
+        self._log_retrieved_docs(all_docs, "Candidates before rerank")
 
-        # 5. Lightweight reranking with LLM
-        ranked = []
-        for doc in unique:
+        # 6. Rerank in-process with MMR (vectors are only fetched when needed)
+        if len(all_docs) > k:
+            ids = [doc.id for doc in all_docs]
             try:
-                score_chain = RERANK_PROMPT | _llm | StrOutputParser()
-                raw_score = score_chain.invoke(
-                    {"question": question, "content": doc.content}
-                ).strip()
-                score = int(raw_score) if raw_score.isdigit() else 5
-                ranked.append((score, doc))
+                embeddings = dict(
+                    BookEmbedding.objects.filter(pk__in=ids).values_list(
+                        "id", "embedding"
+                    )
+                )
+                top_docs = _mmr(all_docs, embeddings, k)
             except Exception as e:
-                logger.error(f"Reranking failed for doc '{doc.content}': {e}")
-                ranked.append((3, doc))  # fallback
-
-        # Sort descending by score, then take top k
-        ranked.sort(key=lambda x: x[0], reverse=True)
-        top_docs = [doc for _, doc in ranked[:k]]
+                logger.error(f"MMR rerank failed, using distance order: {e}")
+                top_docs = all_docs[:k]
+        else:
+            top_docs = all_docs
 
         self._log_retrieved_docs(top_docs, "After reranking")
 
@@ -304,73 +557,50 @@ class AIService:
 
     def ask(self, question: str) -> str:
         """Process the user's question and return a single answer."""
-        intent = self._classify_intent(question)
+        intent, queries = self._classify_and_rewrite(question)
         
         if intent == "small_talk":
-            chain = SMALL_TALK_PROMPT | _llm | StrOutputParser()
             try:
-                return chain.invoke({"question": question})
+                return _SMALL_TALK_CHAIN.invoke({"question": question})
             except Exception as e:
                 logger.error(f"Small talk generation failed: {e}", exc_info=True)
                 return "Hello! I'm your book companion. How can I help you with your reading today?"
 
-        context = self.get_context(question)
-        chain = RETRIEVAL_PROMPT | _llm | StrOutputParser()
+        context = self.get_context(question, queries=queries)
         try:
-            answer = chain.invoke({"context": context, "question": question})
+            answer = _ANSWER_CHAIN.invoke({"context": context, "question": question})
             return answer
         except Exception as e:
             logger.error(f"Generation failed: {e}", exc_info=True)
             return "Sorry, I couldn't generate an answer right now."
 
     def stream_ask(self, question: str):
-        """Stream the answer token by token."""
-        intent = self._classify_intent(question)
+        """Stream the answer, first tokens immediately, then coalesced chunks."""
+        intent, queries = self._classify_and_rewrite(question)
         
         if intent == "small_talk":
-            chain = SMALL_TALK_PROMPT | _llm
             try:
-                for chunk in chain.stream({"question": question}):
-                    yield chunk.content
+                yield from _coalesce(_SMALL_TALK_CHAIN.stream({"question": question}))
                 return
             except Exception as e:
                 logger.error(f"Streaming small talk failed: {e}")
                 yield "Hello! How can I help you with your books today?"
                 return
 
-        context = self.get_context(question)
-        chain = RETRIEVAL_PROMPT | _llm
+        context = self.get_context(question, queries=queries)
         try:
-            for chunk in chain.stream({"context": context, "question": question}):
-                yield chunk.content
+            yield from _coalesce(
+                _ANSWER_CHAIN.stream({"context": context, "question": question})
+            )
         except Exception as e:
             logger.error(f"Streaming failed: {e}")
             yield "Error during streaming."
 
     def add_user_book_to_vectorstore(self, instance) -> None:
         """Embed and upsert UserBook entry into pgvector."""
-        from books.models import BookEmbedding
+        self.bulk_add_user_books([instance])
 
-        doc_text = (
-            f"Book: {instance.book.title} by {instance.book.author}. "
-            f"Genre: {instance.book.genre}. "
-            f"Year: {instance.book.publication_year or 'unknown'}. "
-            f"Status: {instance.status}. "
-            f"Rating: {instance.rating or 'None'}. "
-            f"Notes: {instance.notes or 'No notes'}. "
-            f"Last updated: {instance.date_updated.strftime('%Y-%m-%d %H:%M') if instance.date_updated else 'unknown'}."
-        )
-
-        vector = _embed_text(doc_text)
-
-        BookEmbedding.objects.update_or_create(
-            user_book=instance,
-            defaults={
-                "user": instance.user,
-                "content": doc_text,
-                "embedding": vector,
-            },
-        )
-        logger.info(
-            "Upserted embedding for UserBook %s (user=%s)", instance.id, self.user.id
-        )
+    def bulk_add_user_books(self, instances) -> int:
+        """Embed and upsert many UserBook entries (e.g. an import) with one
+        batched embedding call and one INSERT ... ON CONFLICT statement."""
+        return upsert_user_book_embeddings(instances)
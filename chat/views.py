@@ -1,3 +1,4 @@
+import json
 from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -7,23 +8,32 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
 class ChatAPIView(LoginRequiredMixin, View):
     def post(self, request):
         question = request.POST.get("question")
         if not question:
             return JsonResponse({"error": "No question"}, status=400)
 
-        try:
-            ai_service = AIService(request.user)
-            answer_text = ai_service.ask(question)
-        except Exception as e:
-            logger.error(e)
-            return JsonResponse({"error": str(e)}, status=500)
+        ai_service = AIService(request.user)
 
-        # Use streaming response
-        # response = StreamingHttpResponse(
-        #     ai_service.stream_ask(question), content_type="text/plain"
-        # )
-        # return response
+        # Stream the answer as Server-Sent Events so the first tokens reach
+        # the browser while the rest is still being generated.
+        def event_stream():
+            try:
+                for chunk in ai_service.stream_ask(question):
+                    yield _sse({"delta": chunk})
+            except Exception as e:
+                logger.error(e)
+                yield _sse({"error": str(e)})
+            yield _sse({"done": True})
 
-        return JsonResponse({"answer": answer_text})
+        response = StreamingHttpResponse(
+            event_stream(), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # stop nginx/Railway proxies buffering
+        return response
@@ -13,4 +13,4 @@ python manage.py collectstatic --noinput
 # fi
 
 echo "Starting Gunicorn..."
-exec gunicorn bookshelf.wsgi:application --bind "0.0.0.0:${PORT:-8000}" --workers 1 --threads 10 --timeout 300
\ No newline at end of file
+exec gunicorn bookshelf.wsgi:application --bind "0.0.0.0:${PORT:-8000}" --workers 1 --threads "${GUNICORN_THREADS:-10}" --timeout 300
\ No newline at end of file